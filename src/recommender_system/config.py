@@ -1,5 +1,11 @@
+import os
 from pathlib import Path
 
+# Let BLAS/OpenMP kernels use every core unless the operator already
+# pinned the thread count. Must run before numpy is first imported, and
+# config is the first project module main.py pulls in.
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count() or 1))
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]  # .../recommender_system
 DATA_DIR = PROJECT_ROOT / "data"
 RAW_DIR = DATA_DIR / "raw"
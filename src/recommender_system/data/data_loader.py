@@ -1,33 +1,40 @@
 from __future__ import annotations
 
+import io
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Callable, Tuple, Optional, Union
 
 import pandas as pd
+import polars as pl
 
+from recommender_system.config import PROCESSED_DIR
 
-def _ensure_columns(df: pd.DataFrame, required: list[str], name: str) -> None:
-    missing = [c for c in required if c not in df.columns]
+
+def _columns_of(df) -> list[str]:
+    if isinstance(df, pl.LazyFrame):
+        return df.collect_schema().names()
+    return list(df.columns)
+
+
+def _ensure_columns(df, required: list[str], name: str) -> None:
+    found = _columns_of(df)
+    missing = [c for c in required if c not in found]
     if missing:
         raise ValueError(
             f"[{name}] Missing required columns: {missing}. "
-            f"Found columns: {list(df.columns)}."
+            f"Found columns: {found}."
         )
 
 
-def _coerce_string(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
-    for c in cols:
-        if c in df.columns:
-            df[c] = df[c].astype("string").str.strip()
-    return df
+def _strip_strings(df, cols: list[str]):
+    cols = [c for c in cols if c in _columns_of(df)]
+    return df.with_columns([pl.col(c).cast(pl.Utf8).str.strip_chars() for c in cols])
 
 
-def _fill_string(df: pd.DataFrame, cols: list[str], value: str = "unknown") -> pd.DataFrame:
-    for c in cols:
-        if c in df.columns:
-            df[c] = df[c].fillna(value)
-    return df
+def _fill_string(df, cols: list[str], value: str = "unknown"):
+    cols = [c for c in cols if c in _columns_of(df)]
+    return df.with_columns([pl.col(c).fill_null(value) for c in cols])
 
 
 @dataclass(frozen=True)
@@ -51,76 +58,146 @@ class DataLoader:
       - users.csv:  (user_id, name, age, gender, region)
       - items.csv:  (item_id, title, content_type, genre)
       - events.csv: (user_id, item_id, event_type, watch_seconds, timestamp)
+
+    Cleaned outputs are cached as parquet under `cache_dir` (default:
+    data/processed); when the cache is newer than the CSV it is read
+    directly, skipping parse + cleaning. Pass `cache_dir=None` to disable.
+
+    `encoding` accepts any Python codec; non-utf8 files are decoded in
+    Python and fed to polars as utf-8 bytes.
     """
 
-    def __init__(self, paths: DataPaths, encoding: str = "utf-8"):
+    def __init__(
+        self,
+        paths: DataPaths,
+        encoding: str = "utf-8",
+        cache_dir: Optional[Path] = PROCESSED_DIR,
+    ):
         self.paths = paths
         self.encoding = encoding
+        self.cache_dir = cache_dir
+
+    def _with_parquet_cache(
+        self, csv_path: Path, name: str, build: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        if self.cache_dir is None:
+            return build()
+        cache = self.cache_dir / f"{name}.parquet"
+        try:
+            if cache.exists() and cache.stat().st_mtime >= csv_path.stat().st_mtime:
+                return pd.read_parquet(cache)
+        except Exception:
+            pass  # unreadable/stale cache -> rebuild from CSV
+        df = build()
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(cache, compression="zstd")
+        except Exception:
+            pass  # cache is best-effort; serving from CSV still works
+        return df
 
     def load_users(self) -> pd.DataFrame:
-        df = pd.read_csv(self.paths.users_csv, encoding=self.encoding)
+        return self._with_parquet_cache(self.paths.users_csv, "users", self._load_users_csv)
+
+    def load_items(self) -> pd.DataFrame:
+        return self._with_parquet_cache(self.paths.items_csv, "items", self._load_items_csv)
+
+    def load_events(self) -> pd.DataFrame:
+        return self._with_parquet_cache(self.paths.events_csv, "events", self._load_events_csv)
+
+    def _utf8_source(self, path: Path) -> Union[Path, io.BytesIO]:
+        """Path for utf-8 files; otherwise decode with the configured codec
+        and hand polars utf-8 bytes (polars itself only reads utf8)."""
+        if self.encoding.lower().replace("-", "") in ("utf8", "utf8lossy"):
+            return path
+        return io.BytesIO(path.read_bytes().decode(self.encoding).encode("utf-8"))
+
+    def _read_csv(self, path: Path, string_cols: list[str]) -> pl.DataFrame:
+        return pl.read_csv(
+            self._utf8_source(path),
+            encoding="utf8",
+            schema_overrides={c: pl.Utf8 for c in string_cols},
+        )
+
+    def _load_users_csv(self) -> pd.DataFrame:
+        df = self._read_csv(self.paths.users_csv, ["user_id", "name", "gender", "region"])
 
         # NOTE: disesuaikan dengan contoh kamu: ada kolom "name"
         required = ["user_id", "name", "age", "gender", "region"]
         _ensure_columns(df, required, "users.csv")
 
-        df = _coerce_string(df, ["user_id", "name", "gender", "region"])
+        df = _strip_strings(df, ["user_id", "name", "gender", "region"])
         df = _fill_string(df, ["name", "gender", "region"], value="unknown")
 
         # age -> numeric, missing -> median (fallback 0)
-        df["age"] = pd.to_numeric(df["age"], errors="coerce")
-        if df["age"].notna().any():
-            df["age"] = df["age"].fillna(df["age"].median())
-        else:
-            df["age"] = df["age"].fillna(0)
-        df["age"] = df["age"].round().astype("int64")
+        df = df.with_columns(pl.col("age").cast(pl.Float64, strict=False))
+        median_age = df["age"].median()
+        df = df.with_columns(
+            pl.col("age").fill_null(median_age if median_age is not None else 0.0)
+            .round(0)
+            .cast(pl.Int64)
+        )
 
-        # Final dtypes
-        df["user_id"] = df["user_id"].astype("string")
-        df["name"] = df["name"].astype("string")
-        df["gender"] = df["gender"].astype("string")
-        df["region"] = df["region"].astype("string")
+        # pandas at the boundary; low-cardinality columns become category so
+        # repeated values share storage instead of one Python str per row
+        out = df.to_pandas(use_pyarrow_extension_array=True)
+        out["gender"] = out["gender"].astype("category")
+        out["region"] = out["region"].astype("category")
 
-        return df
+        return out
 
-    def load_items(self) -> pd.DataFrame:
-        df = pd.read_csv(self.paths.items_csv, encoding=self.encoding)
+    def _load_items_csv(self) -> pd.DataFrame:
+        df = self._read_csv(
+            self.paths.items_csv, ["item_id", "title", "content_type", "genre"]
+        )
 
         required = ["item_id", "title", "content_type", "genre"]
         _ensure_columns(df, required, "items.csv")
 
-        df = _coerce_string(df, ["item_id", "title", "content_type", "genre"])
+        df = _strip_strings(df, ["item_id", "title", "content_type", "genre"])
         df = _fill_string(df, ["title", "content_type", "genre"], value="unknown")
 
-        df["item_id"] = df["item_id"].astype("string")
-        df["title"] = df["title"].astype("string")
-        df["content_type"] = df["content_type"].astype("string")
-        df["genre"] = df["genre"].astype("string")
-
-        return df
-
-    def load_events(self) -> pd.DataFrame:
-        df = pd.read_csv(self.paths.events_csv, encoding=self.encoding)
+        return df.to_pandas(use_pyarrow_extension_array=True)
+
+    def _load_events_csv(self) -> pd.DataFrame:
+        # events.csv is the one file that can be huge, so it goes through a
+        # lazy scan and polars' streaming engine: cleaning runs batch by
+        # batch instead of materializing the raw parse in one piece.
+        # Non-utf8 files are transcoded up front (see _utf8_source) and lose
+        # the streaming scan; the full decode already materializes them.
+        src = self._utf8_source(self.paths.events_csv)
+        overrides = {c: pl.Utf8 for c in ["user_id", "item_id", "event_type"]}
+        if isinstance(src, Path):
+            lf = pl.scan_csv(src, encoding="utf8", schema_overrides=overrides)
+        else:
+            lf = pl.read_csv(src, encoding="utf8", schema_overrides=overrides).lazy()
 
         required = ["user_id", "item_id", "event_type", "watch_seconds", "timestamp"]
-        _ensure_columns(df, required, "events.csv")
+        _ensure_columns(lf, required, "events.csv")
 
-        df = _coerce_string(df, ["user_id", "item_id", "event_type"])
-        df = _fill_string(df, ["event_type"], value="unknown")
+        lf = _strip_strings(lf, ["user_id", "item_id", "event_type"])
+        lf = _fill_string(lf, ["event_type"], value="unknown")
 
         # watch_seconds -> numeric, missing -> 0, negative -> 0
-        df["watch_seconds"] = pd.to_numeric(df["watch_seconds"], errors="coerce").fillna(0)
-        df["watch_seconds"] = df["watch_seconds"].clip(lower=0).round().astype("int64")
-
-        # timestamp -> datetime; invalid jadi NaT
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        # timestamp -> datetime; invalid jadi null (NaT di pandas)
+        lf = lf.with_columns(
+            pl.col("watch_seconds")
+            .cast(pl.Float64, strict=False)
+            .fill_null(0)
+            .clip(0)
+            .round(0)
+            .cast(pl.Int64),
+            pl.col("timestamp").cast(pl.Utf8).str.to_datetime(strict=False),
+        )
 
-        # Final dtypes
-        df["user_id"] = df["user_id"].astype("string")
-        df["item_id"] = df["item_id"].astype("string")
-        df["event_type"] = df["event_type"].astype("string")
+        # Final dtypes: ids/event_type repeat heavily across events, so
+        # category dedupes the strings and groupbys run on integer codes
+        out = lf.collect(engine="streaming").to_pandas(use_pyarrow_extension_array=True)
+        out["user_id"] = out["user_id"].astype("category")
+        out["item_id"] = out["item_id"].astype("category")
+        out["event_type"] = out["event_type"].astype("category")
 
-        return df
+        return out
 
     def load_all(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         users = self.load_users()
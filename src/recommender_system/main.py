@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
-from typing import Optional, List
+from typing import Optional
 
 from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 
 from recommender_system.config import RAW_DIR
@@ -19,38 +20,6 @@ class HealthResponse(BaseModel):
     status: str
 
 
-class RecommendationItem(BaseModel):
-    item_id: str
-    title: str = ""
-    score: float
-    reason: str | None = None
-
-
-class PopularResponse(BaseModel):
-    k: int
-    items: List[RecommendationItem]
-
-
-class RecommendationsResponse(BaseModel):
-    user_id: str
-    k: int
-    fallback_used: bool
-    items: List[RecommendationItem]
-
-
-class HistoryItem(BaseModel):
-    item_id: str
-    title: str = ""
-    watch_seconds: int
-    timestamp: str | None = None
-
-
-class HistoryResponse(BaseModel):
-    user_id: str
-    k: int
-    items: List[HistoryItem]
-
-
 # ---------- App Lifespan (load once on startup) ----------
 
 def _get_raw_dir_override():
@@ -66,8 +35,16 @@ async def lifespan(app: FastAPI):
 
     loader = DataLoader(paths)
     try:
-        users_df, items_df, events_df = loader.load_all()
-        app.state.recommender = Recommender(users_df, items_df, events_df)
+        # Load the three CSVs concurrently; parsing happens off the event
+        # loop, so startup costs max(load time) instead of the sum.
+        users_df, items_df, events_df = await asyncio.gather(
+            asyncio.to_thread(loader.load_users),
+            asyncio.to_thread(loader.load_items),
+            asyncio.to_thread(loader.load_events),
+        )
+        app.state.recommender = await asyncio.to_thread(
+            Recommender, users_df, items_df, events_df
+        )
         app.state.startup_error = None
     except Exception as e:
         # Don't kill the app, save the error to display via the API.
@@ -77,7 +54,14 @@ async def lifespan(app: FastAPI):
     # no teardown needed
 
 
-app = FastAPI(title="recommender_system", version="0.1.0", lifespan=lifespan)
+# ORJSONResponse serializes the plain-dict payloads with orjson; the hot
+# endpoints skip Pydantic response validation entirely.
+app = FastAPI(
+    title="recommender_system",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
 def _get_recommender(app: FastAPI) -> Recommender:
@@ -103,7 +87,7 @@ def ready():
     return {"status": "ok"}
 
 
-@app.get("/popular", response_model=PopularResponse)
+@app.get("/popular")
 def popular(
     k: int = Query(10, ge=1, le=100, description="Number of items to return"),
     content_type: Optional[str] = Query(None, description="Filter by content_type (e.g. tv/movie/series/microdrama)"),
@@ -114,7 +98,7 @@ def popular(
     return {"k": k, "items": items}
 
 
-@app.get("/recommendations", response_model=RecommendationsResponse)
+@app.get("/recommendations")
 def recommendations(
     user_id: str = Query(..., min_length=1, description="User ID"),
     k: int = Query(10, ge=1, le=100, description="Number of items to return"),
@@ -133,7 +117,7 @@ def recommendations(
     }
 
 
-@app.get("/history", response_model=HistoryResponse)
+@app.get("/history")
 def history(
     user_id: str = Query(..., min_length=1, description="User ID"),
     k: int = Query(20, ge=1, le=200, description="Number of history items to return"),
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
 
 import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; scipy matvecs cover the fallback
+    njit = None
 
 
 @dataclass
@@ -14,6 +20,74 @@ class RecommendationResult:
     fallback_used: bool
 
 
+if njit is not None:
+
+    @njit(cache=True, fastmath=True)
+    def _csr_two_matvecs(indptr, indices, data, n_users, user_vec):
+        """scores = Xn @ (Xn.T @ user_vec) fused over the CSR arrays of Xn.
+
+        Single sweep per pass, no intermediate sparse temporaries; the
+        scatter pass stays serial because tmp accumulates across rows.
+        """
+        n_items = indptr.size - 1
+        tmp = np.zeros(n_users, dtype=np.float32)
+        for i in range(n_items):
+            v = user_vec[i]
+            if v != 0.0:
+                for p in range(indptr[i], indptr[i + 1]):
+                    tmp[indices[p]] += data[p] * v
+        scores = np.empty(n_items, dtype=np.float32)
+        for i in range(n_items):
+            acc = np.float32(0.0)
+            for p in range(indptr[i], indptr[i + 1]):
+                acc += data[p] * tmp[indices[p]]
+            scores[i] = acc
+        return scores
+
+else:
+    _csr_two_matvecs = None
+
+
+def _string_values(s: pd.Series) -> pd.Series:
+    """astype('string') that, for categoricals, only touches the categories.
+
+    String normalization then runs over n_unique values instead of n_rows
+    and broadcasts through the existing codes.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        try:
+            return s.cat.rename_categories(s.cat.categories.astype(str).str.strip())
+        except ValueError:
+            pass  # stripped categories collide -> fall back to a full cast
+    return s.astype("string")
+
+
+def _clean_watch_seconds(s: pd.Series) -> np.ndarray:
+    """watch_seconds -> non-negative int64 in one in-place numpy pass.
+
+    Replaces the fillna/clip/round/astype Series chain, which allocated a
+    full intermediate per step.
+    """
+    arr = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64, na_value=0.0)
+    np.maximum(arr, 0.0, out=arr)
+    np.rint(arr, out=arr)
+    return arr.astype(np.int64)
+
+
+def _category_values(s: pd.Series) -> pd.Series:
+    """Categorical with clean str categories; no per-row StringArray.
+
+    groupby/factorize on the result run over integer codes instead of
+    hashing a string per row.
+    """
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    try:
+        return s.cat.rename_categories(s.cat.categories.astype(str).str.strip())
+    except ValueError:
+        return s.astype("string")  # cleaned categories collide -> plain strings
+
+
 class Recommender:
     """
     - recommend_popular(k): item terpopuler berdasarkan sum(watch_seconds)
@@ -28,17 +102,37 @@ class Recommender:
         items_df: pd.DataFrame,
         events_df: pd.DataFrame,
         watch_exclude_threshold: int = 600,
+        copy: bool = False,
     ):
-        self.users_df = users_df.copy()
-        self.items_df = items_df.copy()
-        self.events_df = events_df.copy()
+        # fit() normalizes columns out-of-place (assign), so the inputs are
+        # never mutated; copy=True restores the old defensive behaviour.
+        self.users_df = users_df.copy() if copy else users_df
+        self.items_df = items_df.copy() if copy else items_df
+        self.events_df = events_df.copy() if copy else events_df
         self.watch_exclude_threshold = int(watch_exclude_threshold)
 
-        self._popular_df: Optional[pd.DataFrame] = None
-        self._user_item: Optional[pd.DataFrame] = None
+        self._pop_ids: Optional[np.ndarray] = None
+        self._pop_titles: Optional[np.ndarray] = None
+        self._pop_scores: Optional[np.ndarray] = None
+        self._user_mat: Optional[sp.csr_matrix] = None
+        self._user_idx: Optional[dict[str, int]] = None
         self._item_ids: Optional[list[str]] = None
         self._item_index: Optional[dict[str, int]] = None
-        self._item_sim: Optional[np.ndarray] = None
+        self._item_norm: Optional[sp.csr_matrix] = None
+        self._title_by_id: Optional[dict[str, str]] = None
+        self._titles_arr: Optional[np.ndarray] = None
+        self._events_by_user: Optional[dict[str, np.ndarray]] = None
+        self._ev_item: Optional[np.ndarray] = None
+        self._ev_ws: Optional[np.ndarray] = None
+        self._ev_ts: Optional[np.ndarray] = None
+        self._pop_content_lc: Optional[np.ndarray] = None
+        self._pop_genre_lc: Optional[np.ndarray] = None
+        self._item_content_lc: Optional[np.ndarray] = None
+        self._item_genre_lc: Optional[np.ndarray] = None
+        self._items_row_to_col: Optional[np.ndarray] = None
+        self._popular_filtered: Optional[Callable[[Optional[str], Optional[str]], np.ndarray]] = None
+        self._user_scores: Optional[Callable[[str], np.ndarray]] = None
+        self._excluded_by_row: Optional[list[np.ndarray]] = None
 
         self.fit()
 
@@ -46,23 +140,22 @@ class Recommender:
         self._ensure_events_columns()
         self._ensure_items_columns()
 
-        # Normalize types
-        self.events_df["user_id"] = self.events_df["user_id"].astype("string")
-        self.events_df["item_id"] = self.events_df["item_id"].astype("string")
-        self.items_df["item_id"] = self.items_df["item_id"].astype("string")
-        if "title" in self.items_df.columns:
-            self.items_df["title"] = self.items_df["title"].astype("string")
-
-        self.events_df["watch_seconds"] = pd.to_numeric(
-            self.events_df["watch_seconds"], errors="coerce"
-        ).fillna(0)
-        self.events_df["watch_seconds"] = (
-            self.events_df["watch_seconds"].clip(lower=0).round().astype("int64")
+        # Normalize types out-of-place so caller-owned frames stay intact
+        # (categorical columns keep their codes; only the unique categories
+        # get converted)
+        self.events_df = self.events_df.assign(
+            user_id=_category_values(self.events_df["user_id"]),
+            item_id=_category_values(self.events_df["item_id"]),
+            watch_seconds=_clean_watch_seconds(self.events_df["watch_seconds"]),
         )
+        items_cols = {"item_id": _category_values(self.items_df["item_id"])}
+        if "title" in self.items_df.columns:
+            items_cols["title"] = _string_values(self.items_df["title"])
+        self.items_df = self.items_df.assign(**items_cols)
 
         # ---------- Popularity ----------
         pop = (
-            self.events_df.groupby("item_id", as_index=False)["watch_seconds"]
+            self.events_df.groupby("item_id", as_index=False, observed=True)["watch_seconds"]
             .sum()
             .rename(columns={"watch_seconds": "popularity_watch_seconds"})
         )
@@ -79,50 +172,119 @@ class Recommender:
             ["popularity_watch_seconds", "item_id"], ascending=[False, True]
         ).reset_index(drop=True)
 
-        self._popular_df = pop
-
-        # ---------- User-Item matrix ----------
-        ui = (
-            self.events_df.groupby(["user_id", "item_id"], as_index=False)["watch_seconds"]
-            .sum()
-            .rename(columns={"watch_seconds": "watch_seconds_sum"})
+        # Popularity as parallel arrays in sorted order (SoA): every
+        # downstream access is an array index, no BlockManager in the path.
+        self._pop_ids = pop["item_id"].astype(str).to_numpy(dtype=object)
+        self._pop_titles = pop["title"].astype(str).to_numpy(dtype=object)
+        self._pop_scores = pop["popularity_watch_seconds"].to_numpy(dtype=np.int64)
+
+        # Lowercased filter columns, precomputed once so the request path
+        # never re-allocates a StringArray per call.
+        self._pop_content_lc = (
+            pop["content_type"].astype(str).str.lower().to_numpy()
+            if "content_type" in pop.columns
+            else None
+        )
+        self._pop_genre_lc = (
+            pop["genre"].astype(str).str.lower().to_numpy()
+            if "genre" in pop.columns
+            else None
+        )
+        self._item_content_lc = (
+            self.items_df["content_type"].astype(str).str.lower().to_numpy()
+            if "content_type" in self.items_df.columns
+            else None
+        )
+        self._item_genre_lc = (
+            self.items_df["genre"].astype(str).str.lower().to_numpy()
+            if "genre" in self.items_df.columns
+            else None
         )
 
-        user_item = ui.pivot_table(
-            index="user_id",
-            columns="item_id",
-            values="watch_seconds_sum",
-            fill_value=0,
-            aggfunc="sum",
+        # ---------- User-Item matrix ----------
+        # Factorize ids to integer codes and build a sparse CSR matrix --
+        # memory scales with the number of events, not n_users * n_items.
+        # Stable item order: sorted, including items with no interactions.
+        all_item_ids = sorted(self.items_df["item_id"].dropna().astype(str).unique().tolist())
+        u_codes, u_uniq = pd.factorize(self.events_df["user_id"])
+        i_codes = pd.Categorical(
+            self.events_df["item_id"], categories=all_item_ids
+        ).codes
+
+        # Ignore events for items not in items_df, and events with a null
+        # user_id (factorize codes them -1) -- the baseline pivot dropped
+        # NaN users silently.
+        valid = (u_codes >= 0) & (i_codes >= 0)
+        ws = self.events_df["watch_seconds"].to_numpy(dtype=np.float32)
+        mat = sp.csr_matrix(
+            (ws[valid], (u_codes[valid], i_codes[valid])),
+            shape=(len(u_uniq), len(all_item_ids)),
+            dtype=np.float32,
         )
 
-        # Ensure all items exist as columns (even if no interactions)
-        all_item_ids = self.items_df["item_id"].dropna().astype("string").unique().tolist()
-        # Tambahkan kolom yang hilang sekaligus (lebih cepat, tidak fragmented)
-        user_item = user_item.reindex(columns=all_item_ids, fill_value=0.0)
+        self._user_mat = mat
+        self._user_idx = {str(uid): i for i, uid in enumerate(u_uniq)}
+
+        # Per-user excluded item columns (watched > threshold), precomputed
+        # as int32 index arrays straight from the CSR structure.
+        over = mat.data > self.watch_exclude_threshold
+        over_rows = np.repeat(np.arange(mat.shape[0]), np.diff(mat.indptr))[over]
+        over_cols = mat.indices[over].astype(np.int32)
+        splits = np.searchsorted(over_rows, np.arange(mat.shape[0] + 1))
+        self._excluded_by_row = [
+            over_cols[splits[r] : splits[r + 1]] for r in range(mat.shape[0])
+        ]
+        self._item_ids = all_item_ids
+        self._item_index = {iid: idx for idx, iid in enumerate(self._item_ids)}
 
-        # Stable order
-        user_item = user_item.reindex(sorted(user_item.columns), axis=1)
+        # Title lookups: dict for by-id access, array aligned to _item_ids
+        # for direct indexing by matrix position.
+        self._title_by_id = dict(
+            zip(self.items_df["item_id"].astype(str), self.items_df["title"].astype(str))
+        )
+        self._titles_arr = np.array(
+            [self._title_by_id.get(iid, "") for iid in all_item_ids], dtype=object
+        )
+        # Maps items_df row position -> matrix column (-1 when absent), so
+        # filter masks over items_df translate to matrix indices directly.
+        self._items_row_to_col = np.array(
+            [self._item_index.get(iid, -1) for iid in self.items_df["item_id"].astype(str)],
+            dtype=np.int64,
+        )
 
-        self._user_item = user_item
-        self._item_ids = user_item.columns.astype("string").tolist()
-        self._item_index = {iid: idx for idx, iid in enumerate(self._item_ids)}
+        # ---------- Per-user event index (for history) ----------
+        # Columnar views of events plus row indices grouped per user, so
+        # get_user_history never touches pandas on the request path.
+        self._ev_item = self.events_df["item_id"].astype(str).to_numpy()
+        self._ev_ws = self.events_df["watch_seconds"].to_numpy(dtype=np.int64)
+        self._ev_ts = pd.to_datetime(
+            self.events_df["timestamp"], errors="coerce"
+        ).to_numpy(dtype="datetime64[ns]")
+
+        # Drop events with a null item_id from the index (astype(str) leaves
+        # them as float nan, which np.unique cannot sort against strings);
+        # the baseline groupby dropped the NaN group the same way.
+        order = np.argsort(u_codes, kind="stable")
+        order = order[self.events_df["item_id"].notna().to_numpy()[order]]
+        starts = np.searchsorted(u_codes[order], np.arange(len(u_uniq) + 1))
+        self._events_by_user = {
+            str(uid): order[starts[i] : starts[i + 1]] for i, uid in enumerate(u_uniq)
+        }
 
         # ---------- Item-item similarity ----------
-        # item_user shape: (n_items, n_users)
-        item_user = user_item.to_numpy(dtype=np.float32).T
-        n_items, n_users = item_user.shape
-        if n_items == 0:
-            sim = np.zeros((0, 0), dtype=np.float32)
-        elif n_users == 0:
-            # No users / no interactions -> similarity matrix all zeros
-            sim = np.zeros((n_items, n_items), dtype=np.float32)
-        else:
-            sim = cosine_similarity(item_user)
-
-        if sim.size:
-            np.fill_diagonal(sim, 0.0)
-        self._item_sim = sim
+        # Instead of materializing the O(n_items^2) cosine matrix, keep only
+        # the L2-normalized sparse item-user matrix. Cosine scores are then
+        # two sparse matvecs: item_norm @ (item_norm.T @ user_vec).
+        norms = np.sqrt(np.asarray(mat.multiply(mat).sum(axis=0)).ravel())
+        inv = sp.diags((1.0 / np.maximum(norms, 1e-12)).astype(np.float32))
+        # item_norm shape: (n_items, n_users), rows L2-normalized
+        self._item_norm = (mat @ inv).T.tocsr()
+
+        # ---------- Request caches ----------
+        # Fresh lru_cache wrappers every fit, so refitting invalidates
+        # everything without an explicit epoch key.
+        self._popular_filtered = lru_cache(maxsize=64)(self._filter_popular)
+        self._user_scores = lru_cache(maxsize=10_000)(self._compute_user_scores)
 
     def recommend_popular(
         self,
@@ -131,35 +293,28 @@ class Recommender:
         content_type: Optional[str] = None,
         genre: Optional[str] = None,
     ) -> list[dict]:
-        if self._popular_df is None:
+        if self._pop_ids is None:
             raise RuntimeError("Model not fitted")
 
         k = int(k)
         exclude = set(map(str, exclude_item_ids)) if exclude_item_ids else set()
-        df = self._popular_df
-        if content_type and "content_type" in df.columns:
-            ct = str(content_type).strip().lower()
-            df = df[df["content_type"].astype("string").str.lower() == ct]
-        if genre and "genre" in df.columns:
-            g = str(genre).strip().lower()
-            df = df[df["genre"].astype("string").str.lower() == g]
-
-        out: list[dict] = []
-        for _, row in df.iterrows():
-            iid = str(row["item_id"])
-            if iid in exclude:
-                continue
-            out.append(
-                {
-                    "item_id": iid,
-                    "title": str(row.get("title", "")),
-                    "score": float(row.get("popularity_watch_seconds", 0)),
-                    "reason": "popular",
-                }
-            )
-            if len(out) >= k:
-                break
-        return out
+        ct = str(content_type).strip().lower() if content_type else None
+        g = str(genre).strip().lower() if genre else None
+        idx = self._popular_filtered(ct, g)
+
+        # Columnar top-k: drop excluded positions, take the first k, then
+        # index the parallel arrays directly.
+        if exclude:
+            idx = idx[~np.isin(self._pop_ids[idx], list(exclude))]
+        idx = idx[:k]
+        # One vectorized gather + tolist per field instead of a float()/
+        # index call per item; the dicts themselves are what orjson
+        # serializes fastest, so they stay.
+        scores_k = self._pop_scores[idx].astype(np.float64).tolist()
+        return [
+            {"item_id": i, "title": t, "score": s, "reason": "popular"}
+            for i, t, s in zip(self._pop_ids[idx], self._pop_titles[idx], scores_k)
+        ]
 
     def recommend_for_user(
         self,
@@ -168,115 +323,244 @@ class Recommender:
         content_type: Optional[str] = None,
         genre: Optional[str] = None,
     ) -> RecommendationResult:
-        if self._user_item is None or self._item_sim is None or self._item_index is None or self._item_ids is None:
+        if self._user_mat is None or self._user_idx is None or self._item_norm is None or self._item_index is None or self._item_ids is None:
             raise RuntimeError("Model not fitted")
 
         user_id = str(user_id)
         k = int(k)
 
-        def _tag_popular_reason(items: list[dict]) -> list[dict]:
-            # sudah ada reason dari recommend_popular, tapi ini biar aman
-            return [{**d, "reason": d.get("reason", "popular")} for d in items]
-
-        allowed_idx: Optional[set[int]] = None
-        if content_type or genre:
-            m = pd.Series(True, index=self.items_df.index)
-            if content_type and "content_type" in self.items_df.columns:
-                ct = str(content_type).strip().lower()
-                m &= self.items_df["content_type"].astype("string").str.lower() == ct
-            if genre and "genre" in self.items_df.columns:
-                g = str(genre).strip().lower()
-                m &= self.items_df["genre"].astype("string").str.lower() == g
-            allowed_ids = self.items_df.loc[m, "item_id"].astype("string").tolist()
-            allowed_idx = {self._item_index[iid] for iid in allowed_ids if iid in self._item_index}
+        allowed_mask = self._allowed_item_mask(content_type, genre)
 
         # Cold start: user belum ada di matrix
-        if user_id not in self._user_item.index:
-            return RecommendationResult(
-                items=_tag_popular_reason(self.recommend_popular(k, content_type=content_type, genre=genre)),
-                fallback_used=True,
-            )
+        user_row = self._user_idx.get(user_id)
+        if user_row is None:
+            return self._popular_fallback(k, content_type, genre)
+
+        # Score: cosine sim @ user_vector, LRU-cached per user. The
+        # assembler copies the vector only if it needs to write masks into
+        # it, so the common unmasked call allocates nothing here.
+        scores = self._user_scores(user_id)
+        return self._assemble_personalized(
+            user_row, scores, k, content_type, genre, allowed_mask
+        )
 
-        user_row = self._user_item.loc[user_id]  # Series indexed by item_id
-        if float(user_row.sum()) <= 0:
-            return RecommendationResult(
-                items=_tag_popular_reason(self.recommend_popular(k, content_type=content_type, genre=genre)),
-                fallback_used=True,
-            )
+    def recommend_for_users(
+        self,
+        user_ids: Iterable[str],
+        k: int,
+        content_type: Optional[str] = None,
+        genre: Optional[str] = None,
+    ) -> list[RecommendationResult]:
+        """Batched recommend_for_user: one sparse GEMM scores every known
+        user at once instead of a matvec per call."""
+        if self._user_mat is None or self._user_idx is None or self._item_norm is None or self._item_index is None or self._item_ids is None:
+            raise RuntimeError("Model not fitted")
+
+        k = int(k)
+        allowed_mask = self._allowed_item_mask(content_type, genre)
+
+        ids = [str(u) for u in user_ids]
+        rows = [self._user_idx.get(u) for u in ids]
+        known_rows = sorted({r for r in rows if r is not None})
+
+        scores_by_row: dict[int, np.ndarray] = {}
+        if known_rows:
+            V = self._user_mat[known_rows].toarray()          # (U, n_items)
+            tmp = self._item_norm.T @ V.T                     # (n_users, U)
+            S = np.ascontiguousarray((self._item_norm @ tmp).T)  # (U, n_items)
+            # Cancel the self-similarity terms, same as the single-user path.
+            S -= V
+            for j, r in enumerate(known_rows):
+                scores_by_row[r] = S[j]
+
+        out: list[RecommendationResult] = []
+        for user_row in rows:
+            if user_row is None:
+                out.append(self._popular_fallback(k, content_type, genre))
+            else:
+                # Duplicate user_ids share one row of S. That is only safe
+                # because _assemble_personalized copies the vector before
+                # its first mask write and never mutates its argument --
+                # keep that invariant if touching the copy.
+                out.append(
+                    self._assemble_personalized(
+                        user_row,
+                        scores_by_row[user_row],
+                        k,
+                        content_type,
+                        genre,
+                        allowed_mask,
+                    )
+                )
+        return out
+
+    def _allowed_item_mask(
+        self, content_type: Optional[str], genre: Optional[str]
+    ) -> Optional[np.ndarray]:
+        if not (content_type or genre):
+            return None
+        m = np.ones(len(self.items_df), dtype=bool)
+        if content_type and self._item_content_lc is not None:
+            ct = str(content_type).strip().lower()
+            m &= self._item_content_lc == ct
+        if genre and self._item_genre_lc is not None:
+            g = str(genre).strip().lower()
+            m &= self._item_genre_lc == g
+        allowed_cols = self._items_row_to_col[m]
+        allowed_mask = np.zeros(len(self._item_ids), dtype=bool)
+        allowed_mask[allowed_cols[allowed_cols >= 0]] = True
+        return allowed_mask
+
+    def _popular_fallback(
+        self, k: int, content_type: Optional[str], genre: Optional[str]
+    ) -> RecommendationResult:
+        items = self._tag_popular_reason(
+            self.recommend_popular(k, content_type=content_type, genre=genre)
+        )
+        return RecommendationResult(items=items, fallback_used=True)
 
-        # Exclude items watched > threshold
-        watched_over = set(user_row[user_row > self.watch_exclude_threshold].index.astype("string").tolist())
+    @staticmethod
+    def _tag_popular_reason(items: list[dict]) -> list[dict]:
+        # sudah ada reason dari recommend_popular, tapi ini biar aman
+        return [{**d, "reason": d.get("reason", "popular")} for d in items]
 
-        # Score: sim @ user_vector
-        user_vec = user_row.to_numpy(dtype=np.float32)  # (n_items,)
-        scores = self._item_sim @ user_vec              # (n_items,)
+    def _assemble_personalized(
+        self,
+        user_row: int,
+        scores: np.ndarray,
+        k: int,
+        content_type: Optional[str],
+        genre: Optional[str],
+        allowed_mask: Optional[np.ndarray],
+    ) -> RecommendationResult:
+        user_vec = self._user_mat[user_row].toarray().ravel()  # (n_items,) float32
+        if float(user_vec.sum()) <= 0:
+            return self._popular_fallback(k, content_type, genre)
+
+        # Exclude items watched > threshold (sorted int32 index arrays
+        # precomputed in fit); everything below stays in index space and
+        # only maps back to string ids when building the output dicts.
+        watched_over_idx = self._excluded_by_row[user_row]
 
         watched_idx = np.where(user_vec > 0)[0]
 
-        def _reason_for_idx(item_idx: int) -> str | None:
-            # Cari watched item yang paling mirip sebagai "alasan"
-            if watched_idx.size == 0:
-                return None
-            sims = self._item_sim[item_idx, watched_idx]
-            if sims.size == 0:
-                return None
-            best_pos = int(np.argmax(sims))
-            best_sim = float(sims[best_pos])
-            if best_sim <= 0:
-                return None
-            seed_idx = int(watched_idx[best_pos])
-            seed_item_id = self._item_ids[seed_idx]
-            seed_title = self._get_title(seed_item_id)
-            if not seed_title:
-                return None
-            return f"similar to item you watched: {seed_title}"
-
-        # Apply exclusion
-        for iid in watched_over:
-            idx = self._item_index.get(iid)
-            if idx is not None:
-                scores[idx] = -np.inf
-
-        ranked_idx = np.argsort(-scores)
-        results: list[dict] = []
+        # Apply exclusions up front so ranking only has to look at the
+        # finite entries. `scores` may be a cached vector, so copy before
+        # the first write -- and only then; ranking itself never mutates.
+        if watched_over_idx.size or allowed_mask is not None:
+            scores = scores.copy()
+            scores[watched_over_idx] = -np.inf
+            if allowed_mask is not None:
+                scores[~allowed_mask] = -np.inf
+
+        # Top-k selection: O(n) argpartition on the valid entries, then an
+        # O(k log k) sort of just the top slice -- no full argsort.
+        take = min(k, int(np.isfinite(scores).sum()))
+        if take == 0:
+            ranked_idx = np.empty(0, dtype=np.intp)
+        elif take < scores.size:
+            top_part = np.argpartition(-scores, take - 1)[:take]
+            ranked_idx = top_part[np.argsort(-scores[top_part])]
+        else:
+            ranked_idx = np.argsort(-scores)
+
+        # Reason seeds for all candidates at once: one sparse GEMM against
+        # the watched rows plus a row-wise argmax, instead of k separate
+        # slice+argmax calls. seed < 0 means "no usable seed".
+        seed_for_rank = np.full(ranked_idx.size, -1, dtype=np.int64)
+        if ranked_idx.size and watched_idx.size:
+            sims_block = (
+                self._item_norm[ranked_idx] @ self._item_norm[watched_idx].T
+            ).toarray()
+            # never seed an item with itself
+            sims_block[ranked_idx[:, None] == watched_idx[None, :]] = 0.0
+            best_pos = sims_block.argmax(axis=1)
+            best_sim = sims_block[np.arange(ranked_idx.size), best_pos]
+            seed_for_rank = np.where(best_sim > 0, watched_idx[best_pos], -1)
+
+        # Gather scores/titles for the whole top slice in one pass;
+        # ranked_idx only ever holds finite entries, at most k of them.
+        ranked_scores = scores[ranked_idx].astype(np.float64).tolist()
+        ranked_titles = self._titles_arr[ranked_idx]
 
-        for idx in ranked_idx:
-            if len(results) >= k:
-                break
-            if not np.isfinite(scores[idx]):
-                continue
-            if allowed_idx is not None and int(idx) not in allowed_idx:
-                continue
-            iid = self._item_ids[idx]
-            if iid in watched_over:
-                continue
+        results: list[dict] = []
+        for pos, idx in enumerate(ranked_idx):
+            reason = None
+            seed_idx = int(seed_for_rank[pos])
+            if seed_idx >= 0:
+                seed_title = self._titles_arr[seed_idx]
+                if seed_title:
+                    reason = f"similar to item you watched: {seed_title}"
             results.append(
                 {
-                    "item_id": iid,
-                    "title": self._get_title(iid),
-                    "score": float(scores[idx]),
-                    "reason": _reason_for_idx(int(idx)),
+                    "item_id": self._item_ids[idx],
+                    "title": ranked_titles[pos],
+                    "score": ranked_scores[pos],
+                    "reason": reason,
                 }
             )
 
-        # Top-up dengan popular kalau kurang
+        # Top-up dengan popular kalau kurang; only this fallback path needs
+        # the excluded indices as string ids
         if len(results) < k:
-            already = set(r["item_id"] for r in results) | watched_over
+            already = set(r["item_id"] for r in results)
+            already.update(self._item_ids[i] for i in watched_over_idx)
             topup = self.recommend_popular(
                 k - len(results),
                 exclude_item_ids=already,
                 content_type=content_type,
                 genre=genre,
             )
-            results.extend(_tag_popular_reason(topup))
+            results.extend(self._tag_popular_reason(topup))
 
         return RecommendationResult(items=results, fallback_used=False)
 
+    def _filter_popular(self, ct: Optional[str], g: Optional[str]) -> np.ndarray:
+        """Positions into the popularity arrays, filtered by lowercased
+        content_type/genre, still in popularity order."""
+        mask: Optional[np.ndarray] = None
+        if ct is not None and self._pop_content_lc is not None:
+            mask = self._pop_content_lc == ct
+        if g is not None and self._pop_genre_lc is not None:
+            gm = self._pop_genre_lc == g
+            mask = gm if mask is None else mask & gm
+        if mask is None:
+            return np.arange(self._pop_ids.size, dtype=np.intp)
+        return np.flatnonzero(mask)
+
+    # Users at or below this many interacted items take the thin-slice
+    # scoring path instead of a sweep over the whole normalized matrix.
+    _FEW_ITEMS_THRESHOLD = 3
+
+    def _compute_user_scores(self, user_id: str) -> np.ndarray:
+        """Raw cosine scores for a known user, before any exclusion masks."""
+        Xn = self._item_norm
+        row = self._user_mat.getrow(self._user_idx[user_id])
+        if row.nnz <= self._FEW_ITEMS_THRESHOLD:
+            # Long-tail user: the first pass only needs the few rows of
+            # item_norm the user actually touched.
+            tmp = np.asarray(Xn[row.indices].T @ row.data, dtype=np.float32).ravel()
+            scores = Xn @ tmp
+            scores[row.indices] -= row.data  # cancel self-similarity
+            return scores
+
+        user_vec = row.toarray().ravel()
+        # Two sparse matvecs; the full item-item matrix never exists.
+        if _csr_two_matvecs is not None:
+            scores = _csr_two_matvecs(
+                Xn.indptr, Xn.indices, Xn.data, Xn.shape[1], user_vec
+            )
+        else:
+            tmp = Xn.T @ user_vec              # (n_users,)
+            scores = Xn @ tmp                  # (n_items,)
+        # Cancel the self-similarity term (previously fill_diagonal(sim, 0)).
+        scores -= user_vec
+        return scores
+
     def _get_title(self, item_id: str) -> str:
-        m = self.items_df["item_id"].astype("string") == str(item_id)
-        if not m.any():
+        if self._title_by_id is None:
             return ""
-        return str(self.items_df.loc[m, "title"].iloc[0])
+        return self._title_by_id.get(str(item_id), "")
 
     def get_user_history(self, user_id: str, k: int = 20) -> list[dict]:
         """
@@ -289,37 +573,42 @@ class Recommender:
         if k <= 0:
             return []
 
-        if "user_id" not in self.events_df.columns:
-            return []
+        if self._events_by_user is None:
+            raise RuntimeError("Model not fitted")
 
-        df = self.events_df[self.events_df["user_id"].astype("string") == user_id].copy()
-        if df.empty:
+        idx = self._events_by_user.get(user_id)
+        if idx is None or idx.size == 0:
             return []
 
-        # Pastikan timestamp bisa disort (kalau sudah datetime dari DataLoader, ini aman)
-        if "timestamp" in df.columns:
-            try:
-                df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-            except Exception:
-                pass
-
-        # Ambil event paling recent per item_id, dan total watch_seconds per item_id
-        agg = df.groupby("item_id", as_index=False).agg(
-            watch_seconds=("watch_seconds", "sum"),
-            last_timestamp=("timestamp", "max"),
-        )
-        agg = agg.sort_values(["last_timestamp", "watch_seconds"], ascending=[False, False]).head(k)
+        items = self._ev_item[idx]
+        ws = self._ev_ws[idx]
+        ts = self._ev_ts[idx].view("int64")  # NaT becomes int64 min, sorts last
+
+        # Aggregate per item_id: total watch_seconds + most recent timestamp
+        uniq, inv = np.unique(items, return_inverse=True)
+        ws_sum = np.bincount(inv, weights=ws).astype(np.int64)
+        last_ts = np.full(uniq.size, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(last_ts, inv, ts)
+
+        # Most recent first, watch_seconds as tie-break. Sort the full
+        # aggregate: partitioning on last_ts alone would pick an arbitrary
+        # subset when timestamps tie at the k boundary (NaT all share one
+        # sentinel), and per-user distinct-item counts are small anyway.
+        top = np.lexsort((ws_sum, last_ts))[::-1][:k]
 
         out: list[dict] = []
-        for _, row in agg.iterrows():
-            iid = str(row["item_id"])
-            ts = row.get("last_timestamp")
+        for i in top:
+            ts_i = last_ts[i]
             out.append(
                 {
-                    "item_id": iid,
-                    "title": self._get_title(iid),
-                    "watch_seconds": int(row.get("watch_seconds", 0)),
-                    "timestamp": ts.isoformat() if hasattr(ts, "isoformat") and pd.notna(ts) else None,
+                    "item_id": str(uniq[i]),
+                    "title": self._get_title(uniq[i]),
+                    "watch_seconds": int(ws_sum[i]),
+                    "timestamp": (
+                        pd.Timestamp(ts_i, unit="ns").isoformat()
+                        if ts_i != np.iinfo(np.int64).min
+                        else None
+                    ),
                 }
             )
         return out